@@ -7,10 +7,13 @@ This script analyzes Lichess game data to generate popularity statistics
 for chess openings. It's designed to run in Google Colab with checkpoint/resume capability.
 
 Requirements:
+- Python 3.10+
 - python-chess>=1.999
 - requests>=2.28.0
 - zstandard>=0.18.0
 - tqdm>=4.62.0
+- numpy
+- orjson (optional, faster checkpoints)
 
 Usage:
 1. Upload this script to Google Colab
@@ -22,25 +25,38 @@ Date: July 14, 2025
 """
 
 import os
+import re
 import json
 import zstandard as zstd
-import io
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import chess
-import chess.pgn
 from datetime import datetime, timedelta
 import time
-from typing import Dict, List, Set, Optional, Tuple
+from typing import Dict, FrozenSet, List, Optional, Tuple
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from tqdm import tqdm
 import threading
 import queue
+import concurrent.futures
+import multiprocessing
 import sys
+import argparse
 import tempfile
 import platform
 from pathlib import Path
 import shutil
+import pickle
+import ctypes
+import contextlib
+import mmap
+
+try:
+    import orjson
+except ImportError:  # Optional: checkpoints fall back to the stdlib json module
+    orjson = None
 
 class TqdmLoggingHandler(logging.Handler):
     """Custom logging handler that works with tqdm progress bars"""
@@ -76,7 +92,77 @@ def setup_logging():
 # Setup logging
 logger = setup_logging()
 
-@dataclass
+# PGN scanning patterns (compiled once, applied to raw game bytes)
+_WHITE_ELO_RE = re.compile(rb'\[WhiteElo "(\d+)"\]')  # Unrated players ("?") don't match
+_BLACK_ELO_RE = re.compile(rb'\[BlackElo "(\d+)"\]')
+_RESULT_RE = re.compile(rb'\[Result "([^"]*)"\]')
+_COMMENT_RE = re.compile(rb'\{[^}]*\}')
+_SAN_RE = re.compile(rb'\b([KQRBN]?[a-h]?[1-8]?x?[a-h][1-8](?:=[QRBN])?|O-O(?:-O)?)[+#]?')
+
+# Limit analysis to the first 35 moves (70 plies) of each game
+MAX_PLIES = 70
+
+# Bytes per zstd read; well above ZSTD_DStreamOutSize() to keep Python<->C calls rare
+STREAM_READ_SIZE = 1 << 20  # 1 MiB
+
+# (connect, read) timeouts for requests to database.lichess.org
+HTTP_TIMEOUT = (10, 300)
+
+# Attempts per streamed month, and the back-off between them (matches download_file_with_retry)
+STREAM_RETRIES = 3
+STREAM_RETRY_DELAY = 30
+
+# Parser processes are spawned, not forked: forking while the download thread holds
+# logging/tqdm locks can deadlock the child
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+# Seconds parser processes get to stop on their own after shutdown before they are terminated
+WORKER_STOP_GRACE = 10
+
+# Default cap on months streamed from database.lichess.org at once (independent of --workers)
+DEFAULT_MAX_STREAMS = 2
+
+# Cached (--cache-raw) downloads of files at least this large are split into parallel byte ranges
+DOWNLOAD_PARTS = 4
+PARALLEL_DOWNLOAD_MIN_SIZE = 64 * 1024 * 1024
+
+# Finished months between checkpoint writes (the last batch is flushed at shutdown)
+CHECKPOINT_EVERY_MONTHS = 4
+
+# Bytes read to validate a cached file (magic number, zstd frame header, truncation check)
+VALIDATION_PROBE_SIZE = 1024
+
+# Checked on every temp-file remove/move retry, so look it up once
+_IS_WINDOWS = platform.system() == "Windows"
+
+# Position key: occupancy and piece bitboards, side to move, castling rights and legal
+# en passant square. Equivalent to the first four FEN fields, built without rendering a string.
+PositionKey = Tuple[int, int, int, int, int, int, int, int, bool, int, Optional[int]]
+
+def _board_key(board: chess.Board) -> PositionKey:
+    """Position key for a board (FEN without clocks, as bitboards)"""
+    # Only a legal en passant square is part of the key, matching board.fen()/ECO FENs
+    return (board.occupied, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[chess.WHITE], board.turn, board.clean_castling_rights(),
+            board.ep_square if board.ep_square is not None and board.has_legal_en_passant() else None)
+
+def _position_key(fen: str) -> PositionKey:
+    """Position key for a FEN string (halfmove/fullmove clocks are ignored)"""
+    return _board_key(chess.Board(fen))
+
+# Partial stats gathered by a parser thread/process: position key -> counter list,
+# indexed by the slots below, so per-game updates are plain list increments
+GAMES, RATING_SUM, WHITE_WINS, BLACK_WINS, DRAWS = range(5)
+PartialStats = Dict[PositionKey, List[int]]
+
+# Confidence score by sample size: <10, 10+, 100+ and 1000+ games
+CONFIDENCE_GAME_COUNTS = np.array([10, 100, 1000])
+CONFIDENCE_LEVELS = np.array([0.4, 0.6, 0.8, 1.0])
+
+# PGN Result tag -> counter slot (unfinished games, '*', only count towards GAMES)
+RESULT_SLOTS = {b'1-0': WHITE_WINS, b'0-1': BLACK_WINS, b'1/2-1/2': DRAWS}
+
+@dataclass(slots=True)
 class PopularityStats:
     """Statistics for a chess opening position"""
     popularity_score: int = 0
@@ -85,9 +171,87 @@ class PopularityStats:
     black_wins: int = 0
     draws: int = 0
     games_analyzed: int = 0
-    avg_rating: Optional[float] = None
+    avg_rating: Optional[float] = None  # Derived from rating_sum when results are saved
     confidence_score: float = 0.0
     analysis_date: str = ""
+    rating_sum: int = 0  # Sum of both players' ratings over all games (exact, no running average)
+    
+    def to_dict(self) -> dict:
+        """Serialize to a plain dict (cheaper than dataclasses.asdict's recursive copy)"""
+        return {
+            'popularity_score': self.popularity_score,
+            'frequency_count': self.frequency_count,
+            'white_wins': self.white_wins,
+            'black_wins': self.black_wins,
+            'draws': self.draws,
+            'games_analyzed': self.games_analyzed,
+            'avg_rating': self.avg_rating,
+            'confidence_score': self.confidence_score,
+            'analysis_date': self.analysis_date,
+            'rating_sum': self.rating_sum
+        }
+
+class StreamingFetcher:
+    """File-like view of a remote file, fed by a download thread through an OS pipe"""
+    
+    def __init__(self, session: requests.Session, url: str, chunk_size: int,
+                 stop_event: threading.Event):
+        self.session = session
+        self.url = url
+        self.chunk_size = chunk_size
+        self.stop_event = stop_event
+        self.error: Optional[Exception] = None
+        
+        # The pipe's kernel buffer bounds memory held in flight; reads block in C, not Python
+        read_fd, write_fd = os.pipe()
+        self._reader = os.fdopen(read_fd, 'rb')
+        self._writer = os.fdopen(write_fd, 'wb')
+        self._complete = False  # Set once the whole body went into the pipe
+        self._started = threading.Event()  # Set once the consumer starts reading
+        self._closed = threading.Event()   # Set once the consumer is done
+    
+    def pump(self) -> bool:
+        """Download the file into the pipe (run on its own thread)"""
+        try:
+            # Don't open the connection until the consumer is ready for it
+            while not self._started.wait(timeout=1):
+                if self._closed.is_set() or self.stop_event.is_set():
+                    return False
+            
+            with self.session.get(self.url, stream=True, timeout=HTTP_TIMEOUT) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if self._closed.is_set() or self.stop_event.is_set():
+                        return False
+                    self._writer.write(chunk)  # Blocks while the parser is behind
+            self._complete = True
+            return True
+        except Exception as e:
+            self.error = e
+            return False
+        finally:
+            # End of stream for the reader (also wakes it after an error)
+            try:
+                self._writer.close()
+            except OSError:
+                pass  # Reader already gone
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes, blocking until the pump provides them"""
+        self._started.set()
+        data = self._reader.read(size)
+        
+        # The pipe closes on errors and shutdown too, so only a completed pump means a real EOF
+        if not data and size != 0 and not self._complete:
+            if self.stop_event.is_set():
+                raise IOError(f"Shutdown requested while streaming {self.url}")
+            raise IOError(f"Download of {self.url} failed: {self.error}")
+        return data
+    
+    def close(self) -> None:
+        """Signal the pump that no more data will be read"""
+        self._closed.set()
+        self._reader.close()  # A pump blocked on write gets a broken pipe
 
 class LichessAnalyzer:
     """Main analyzer class for processing Lichess data"""
@@ -96,9 +260,29 @@ class LichessAnalyzer:
                  start_date: str = "2021-07", 
                  checkpoint_file: str = "stats_checkpoint.json",
                  output_file: str = "popularity_stats.json",
-                 work_dir: Optional[str] = None):
+                 work_dir: Optional[str] = None,
+                 cache_raw: bool = False,
+                 max_workers: Optional[int] = None,
+                 fast_checkpoint: bool = False,
+                 decompress_once: bool = False,
+                 max_streams: int = DEFAULT_MAX_STREAMS):
         self.start_date = start_date
         
+        # Number of parser processes (PGN parsing is CPU-bound, so threads would share the GIL)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        
+        # Concurrent full-month downloads from Lichess, however many processes parse them
+        self.max_streams = max(1, max_streams)
+        
+        # Stream downloads straight into the parser unless raw files should be kept on disk
+        self.cache_raw = cache_raw or decompress_once
+        
+        # Decompress each cached month to a .pgn once, then split it across parser processes
+        self.decompress_once = decompress_once
+        
+        # Pickle checkpoints instead of JSON (much faster to write, not human-readable)
+        self.fast_checkpoint = fast_checkpoint
+        
         # Use OS-agnostic paths
         self.work_dir = Path(work_dir) if work_dir else Path.cwd()
         self.checkpoint_file = self.work_dir / checkpoint_file
@@ -107,18 +291,30 @@ class LichessAnalyzer:
         # Get OS-specific configuration
         self.os_config = get_os_specific_config()
         
-        self.target_fens: Set[str] = set()
+        self.target_fens: FrozenSet[PositionKey] = frozenset()  # Position keys of target FENs
+        self.fens_by_key: Dict[PositionKey, List[str]] = {}  # Position key -> full ECO FENs
+        self.target_occupancy: FrozenSet[int] = frozenset()  # Occupied bitboards of target positions
         self.stats: Dict[str, PopularityStats] = {}
-        self.processed_months: Set[str] = set()
+        self.processed_months: FrozenSet[str] = frozenset()  # Replaced, never mutated (lock-free reads)
+        self.validated_files: Dict[str, bool] = {}  # Month -> startup validation result of its temp file
         
         # Lichess database URL pattern
         self.lichess_base_url = "https://database.lichess.org/standard/lichess_db_standard_rated_{}.pgn.zst"
         
+        # One keep-alive session for all requests so TCP/TLS setup is paid once per connection
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0))
+        self.session.headers['Accept-Encoding'] = 'identity'  # Files are already zstd-compressed
+        
         # Threading infrastructure for parallel processing
         self.download_queue = queue.Queue(maxsize=3)  # Limit to 3 files max
         self.download_complete = threading.Event()
-        self.shutdown_requested = threading.Event()
+        self.shutdown_requested = _MP_CONTEXT.Event()  # Shared with the parser processes
         self.stats_lock = threading.Lock()  # Protect stats dictionary
+        self.months_lock = threading.Lock()  # Serialize processed_months writers
+        self.unsaved_months = 0  # Months finished since the last checkpoint write
+        self.files_after_checkpoint: List[str] = []  # Cached downloads to delete once checkpointed
+        self._tls = threading.local()  # Per-thread board and partial stats (merged once per month)
         
         # Initialize thread-safe progress monitoring
         self.initialize_progress_monitoring()
@@ -134,6 +330,7 @@ class LichessAnalyzer:
         """Load target FEN positions from ECO JSON files"""
         logger.info("Loading target FEN positions from ECO files...")
         
+        target_fens = set(self.target_fens)
         for eco_file in eco_files:
             try:
                 if os.path.exists(eco_file):
@@ -143,7 +340,17 @@ class LichessAnalyzer:
                         for fen in eco_data.keys():
                             fen = fen.strip()
                             if fen:
-                                self.target_fens.add(fen)
+                                # Match on position only; several ECO FENs may share a key
+                                try:
+                                    key = _position_key(fen)
+                                except ValueError as e:
+                                    # One malformed key shouldn't cost the rest of the file
+                                    logger.warning(f"Skipping invalid FEN {fen!r} in {eco_file}: {e}")
+                                    continue
+                                target_fens.add(key)
+                                fens = self.fens_by_key.setdefault(key, [])
+                                if fen not in fens:
+                                    fens.append(fen)
                                 # Initialize stats for this FEN
                                 if fen not in self.stats:
                                     self.stats[fen] = PopularityStats()
@@ -152,64 +359,106 @@ class LichessAnalyzer:
             except Exception as e:
                 logger.error(f"Error loading ECO file {eco_file}: {e}")
         
+        self.target_fens = frozenset(target_fens)
+        
+        # Cheap pre-filter: a position can only match if its occupied-square bitboard does
+        self.target_occupancy = frozenset(key[0] for key in self.target_fens)
+        
         logger.info(f"Loaded {len(self.target_fens)} target FEN positions")
     
     def load_checkpoint(self) -> None:
-        """Load checkpoint data if it exists"""
+        """Load checkpoint data if it exists (JSON or --fast-checkpoint pickle)"""
         if self.checkpoint_file.exists():
             try:
-                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
-                    checkpoint_data = json.load(f)
+                raw = self.checkpoint_file.read_bytes()
+                if raw.startswith(b'\x80'):  # Pickle protocol 2+ header
+                    checkpoint_data = pickle.loads(raw)
+                elif orjson is not None:
+                    checkpoint_data = orjson.loads(raw)
+                else:
+                    checkpoint_data = json.loads(raw)
                     
-                self.processed_months = set(checkpoint_data.get('processed_months', []))
+                self.processed_months = frozenset(checkpoint_data.get('processed_months', []))
                 
                 # Restore stats from checkpoint
                 for fen, stats_data in checkpoint_data.get('stats', {}).items():
-                    self.stats[fen] = PopularityStats(**stats_data)
+                    stats = PopularityStats(**stats_data)
+                    
+                    # Older checkpoints only stored the running average
+                    if 'rating_sum' not in stats_data and stats.avg_rating is not None:
+                        stats.rating_sum = round(stats.avg_rating * 2 * stats.games_analyzed)
+                    self.stats[fen] = stats
                 
                 logger.info(f"Loaded checkpoint with {len(self.processed_months)} processed months")
             except Exception as e:
                 logger.error(f"Error loading checkpoint: {e}")
     
-    def save_checkpoint(self) -> None:
-        """Save current progress to checkpoint file (thread-safe)"""
+    def save_checkpoint(self) -> bool:
+        """Save current progress to checkpoint file (thread-safe, atomic), returns success"""
         try:
             with self.stats_lock:
                 checkpoint_data = {
-                    'processed_months': list(self.processed_months),
-                    'stats': {fen: asdict(stats) for fen, stats in self.stats.items()},
+                    'processed_months': sorted(self.processed_months),
+                    'stats': {fen: stats.to_dict() for fen, stats in self.stats.items()},
                     'last_updated': datetime.now().isoformat()
                 }
+                months_saved = len(self.processed_months)
                 
-                # Ensure directory exists
-                self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                    json.dump(checkpoint_data, f, indent=2)
-                
-                logger.info(f"Checkpoint saved with {len(self.processed_months)} processed months")
+                # Compact encoding; the checkpoint is only read back by this script
+                if self.fast_checkpoint:
+                    payload = pickle.dumps(checkpoint_data, protocol=pickle.HIGHEST_PROTOCOL)
+                elif orjson is not None:
+                    payload = orjson.dumps(checkpoint_data)
+                else:
+                    payload = json.dumps(checkpoint_data).encode('utf-8')
+            
+            # Ensure directory exists
+            self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+            
+            # Write outside the lock; a crash mid-write leaves the previous checkpoint intact
+            atomic_write_bytes(self.checkpoint_file, payload)
+            
+            logger.info(f"Checkpoint saved with {months_saved} processed months")
+            return True
         except Exception as e:
             logger.error(f"Error saving checkpoint: {e}")
+            return False
+    
+    def flush_checkpoint(self) -> None:
+        """Write the checkpoint if any month finished since the last write"""
+        if self.unsaved_months:
+            if not self.save_checkpoint():
+                return  # Keep the count so the next flush (at the latest at shutdown) tries again
+            self.unsaved_months = 0
+            
+            # A resumed run no longer needs the raw downloads of months recorded on disk
+            files, self.files_after_checkpoint = self.files_after_checkpoint, []
+            for raw_file in files:
+                if safe_file_remove(raw_file, defer=True):  # Processed months are never downloaded again
+                    logger.info(f"Removed cached {raw_file}")
+                else:
+                    logger.warning(f"Failed to delete {raw_file}")
     
     def generate_month_list(self) -> List[str]:
         """Generate list of months from start_date to present"""
-        months = []
-        
         # Parse start date
         start_year, start_month = map(int, self.start_date.split('-'))
         current_date = datetime.now()
         
-        # Generate months
-        year, month = start_year, start_month
-        while year < current_date.year or (year == current_date.year and month <= current_date.month):
-            months.append(f"{year}-{month:02d}")
-            
-            month += 1
-            if month > 12:
-                month = 1
-                year += 1
-        
-        return months
+        # Count months from year 0 so the range is a single arithmetic sequence
+        first = start_year * 12 + start_month - 1
+        last = current_date.year * 12 + current_date.month - 1
+        return [f"{index // 12}-{index % 12 + 1:02d}" for index in range(first, last + 1)]
+    
+    def remote_file_available(self, url: str) -> bool:
+        """Check with a HEAD request that a monthly file has been published"""
+        try:
+            response = self.session.head(url, timeout=HTTP_TIMEOUT, allow_redirects=True)
+        except requests.RequestException as e:
+            # Let the download path and its retries deal with connectivity problems
+            logger.warning(f"HEAD request for {url} failed ({e}), trying the download anyway")
+            return True
+        return response.status_code != 404
     
     def download_and_process_month(self, month: str) -> bool:
         """Download and process a single month of Lichess data"""
@@ -230,6 +479,7 @@ class LichessAnalyzer:
             
             # Stage 2: Process the local file
             success = self.process_local_file(temp_file, month)
+            month_stats = self._take_tls_stats()
             
             # Clean up temp file
             try:
@@ -238,7 +488,8 @@ class LichessAnalyzer:
                 pass
             
             if success:
-                self.processed_months.add(month)
+                self._merge_partial_stats(month_stats)
+                self._mark_month_processed(month)
                 return True
             else:
                 return False
@@ -264,39 +515,34 @@ class LichessAnalyzer:
                 # Clean up any existing temp file
                 safe_file_remove(str(temp_path))
                 
-                response = requests.get(url, stream=True)
-                response.raise_for_status()
+                # Ask for the size first; if the server serves byte ranges, fetch them in parallel
+                head = self.session.head(url, timeout=HTTP_TIMEOUT, allow_redirects=True)
+                head.raise_for_status()
                 
                 # Get file size for progress tracking
-                file_size = int(response.headers.get('content-length', 0))
+                file_size = int(head.headers.get('content-length', 0))
                 logger.info(f"File size: {file_size / (1024*1024*1024):.2f} GB")
+                ranged = (head.headers.get('accept-ranges', '').lower() == 'bytes' and
+                          file_size >= PARALLEL_DOWNLOAD_MIN_SIZE)
                 
                 # Use OS-specific chunk size
                 chunk_size = self.os_config['chunk_size']
                 
                 # Use tqdm progress bar for download
-                progress_bar = tqdm(
-                    desc=f"Downloading {filename}",
-                    total=file_size,
-                    unit='B',
-                    unit_scale=True,
-                    unit_divisor=1024,
-                    ncols=80,
-                    mininterval=0.5,
-                    maxinterval=2.0,
-                    leave=True,
-                    file=sys.stdout,
-                    position=0,
-                    dynamic_ncols=True
-                )
+                progress_bar = self.create_progress_bar(f"Downloading {filename}", file_size)
                 
                 try:
                     # Download to temporary file first
-                    with open(temp_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=chunk_size):
-                            if chunk:
-                                f.write(chunk)
-                                progress_bar.update(len(chunk))
+                    if ranged:
+                        self.download_ranges(url, temp_path, file_size, progress_bar)
+                    else:
+                        with self.session.get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+                            response.raise_for_status()
+                            with open(temp_path, 'wb') as f:
+                                for chunk in response.iter_content(chunk_size=chunk_size):
+                                    if chunk:
+                                        f.write(chunk)
+                                        progress_bar.update(len(chunk))
                     
                     progress_bar.close()
                     
@@ -331,6 +577,50 @@ class LichessAnalyzer:
         
         return False
     
+    def download_ranges(self, url: str, path: Path, file_size: int, progress_bar: tqdm,
+                        parts: int = DOWNLOAD_PARTS) -> None:
+        """Download a file as parallel HTTP byte ranges written into a pre-sized file (raises on failure)"""
+        # Pre-size the file so each range can be written in place
+        with open(path, 'wb') as f:
+            f.truncate(file_size)
+        
+        chunk_size = self.os_config['chunk_size']
+        progress_lock = threading.Lock()
+        range_failed = threading.Event()  # Stops the other ranges; the whole file is retried anyway
+        
+        def fetch_range(start: int, end: int) -> None:
+            with self.session.get(url, headers={'Range': f'bytes={start}-{end}'},
+                                  stream=True, timeout=HTTP_TIMEOUT) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise IOError(f"Server ignored range request (HTTP {response.status_code})")
+                
+                # Separate handle per range; seek+write works on every OS (unlike os.pwrite)
+                with open(path, 'r+b') as f:
+                    f.seek(start)
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if range_failed.is_set():
+                            raise IOError(f"Range {start}-{end} abandoned after another range failed")
+                        if chunk:
+                            f.write(chunk)
+                            with progress_lock:
+                                progress_bar.update(len(chunk))
+                    written = f.tell() - start
+            
+            if written != end - start + 1:
+                raise IOError(f"Range {start}-{end} incomplete ({written:,} bytes)")
+        
+        part_size = -(-file_size // parts)  # Ceiling division
+        ranges = [(start, min(start + part_size, file_size) - 1) for start in range(0, file_size, part_size)]
+        logger.info(f"Downloading in {len(ranges)} parallel ranges")
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="RangeDownload") as executor:
+            futures = [executor.submit(fetch_range, start, end) for start, end in ranges]
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception() is not None:
+                    range_failed.set()  # Before the with block waits for the other ranges
+                    raise future.exception()  # The first failed range
+    
     def process_local_file(self, filename: str, month: str) -> bool:
         """Process a local zst file with progress bar"""
         try:
@@ -342,213 +632,297 @@ class LichessAnalyzer:
             
             # Process the compressed file using high-level stream reader
             with open(filename, 'rb') as f:
-                decompressor = zstd.ZstdDecompressor()
+                return self.process_stream(f, month, file_size)
                 
-                # Use the high-level stream reader with progress bar
-                with decompressor.stream_reader(f) as reader:
-                    # Create progress bar with thread-safe settings
-                    progress_bar = tqdm(
-                        desc=f"Processing {month}",
-                        total=file_size,
-                        unit='B',
-                        unit_scale=True,
-                        unit_divisor=1024,
-                        ncols=80,
-                        mininterval=1.0,   # Update at most every 1 second
-                        maxinterval=3.0,   # Update at least every 3 seconds
-                        leave=True,        # Keep progress bar after completion
-                        file=sys.stdout,   # Explicitly use stdout
-                        position=0,        # Position for multi-threaded env
-                        dynamic_ncols=True # Adjust width dynamically
-                    )
+        except Exception as e:
+            logger.error(f"Error processing local file {filename}: {e}")
+            return False
+    
+    def decompress_to_pgn(self, filename: str) -> str:
+        """Decompress a cached .pgn.zst next to itself (reused if already there)"""
+        pgn_path = Path(filename).with_suffix('')
+        if not pgn_path.exists():
+            logger.info(f"Decompressing {filename} to {pgn_path}")
+            
+            # Write under a temporary name so a half-written .pgn is never reused
+            partial_path = pgn_path.with_suffix('.pgn.tmp')
+            with open(filename, 'rb') as src, open(partial_path, 'wb') as dst:
+                zstd.ZstdDecompressor().copy_stream(src, dst, read_size=STREAM_READ_SIZE,
+                                                    write_size=STREAM_READ_SIZE)
+            os.replace(partial_path, pgn_path)
+        return str(pgn_path)
+    
+    def split_pgn_ranges(self, filename: str, parts: int) -> List[Tuple[int, int]]:
+        """Split a decompressed PGN into byte ranges that start and end on game boundaries"""
+        file_size = os.path.getsize(filename)
+        if file_size == 0:
+            return []
+        
+        with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bounds = [0]
+            for i in range(1, parts):
+                # Games are separated by a blank line after the movetext
+                cut = mm.find(b'\n\n\n', max(file_size * i // parts, bounds[-1]))
+                if cut < 0:
+                    break
+                bounds.append(cut + 3)
+            bounds.append(file_size)
+        
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+    
+    def process_pgn_range(self, filename: str, start: int, end: int) -> int:
+        """Process the games in one byte range of a decompressed PGN, returns the game count"""
+        games = 0
+        with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = start
+            while pos < end:
+                if games % 1000 == 0 and self.shutdown_requested.is_set():
+                    raise IOError(f"Shutdown requested while processing {filename}")
+                sep = mm.find(b'\n\n\n', pos, end)
+                stop = sep if sep >= 0 else end
+                game_text = mm[pos:stop]
+                if game_text.strip():
+                    self.process_game(game_text)
+                    games += 1
+                pos = stop + 3
+        return games
+    
+    def process_fetched_stream(self, fetcher: 'StreamingFetcher', month: str) -> bool:
+        """Process a zst file while its download is still being pumped in"""
+        try:
+            logger.info(f"Processing streamed download {fetcher.url}")
+            return self.process_stream(fetcher, month)
+        except Exception as e:
+            logger.error(f"Error processing streamed download for {month}: {e}")
+            return False
+        finally:
+            # Stops the transfer if we bailed out early
+            fetcher.close()
+    
+    def process_stream(self, source, month: str, total_size: Optional[int] = None) -> bool:
+        """Decompress and process a zst stream of PGN games (raises on I/O errors)"""
+        decompressor = zstd.ZstdDecompressor()
+        
+        # Use the high-level stream reader with progress bar
+        with decompressor.stream_reader(source, read_size=STREAM_READ_SIZE) as reader:
+            # Create progress bar with thread-safe settings
+            progress_bar = self.create_progress_bar(f"Processing {month}", total_size)
+            
+            logger.info(f"Started processing progress bar for {month}")
+            
+            game_buffer = bytearray()
+            search_start = 0  # Where to resume looking for a game separator
+            games_processed = 0
+            bytes_read = 0
+            
+            try:
+                while True:
+                    if self.shutdown_requested.is_set():
+                        raise IOError(f"Shutdown requested while processing {month}")
+                    
+                    # Read decompressed data in chunks
+                    chunk = reader.read(STREAM_READ_SIZE)
+                    if not chunk:
+                        break
                     
-                    logger.info(f"Started processing progress bar for {month}")
+                    # Update progress bar (approximate based on chunk size)
+                    bytes_read += len(chunk)
+                    progress_bar.update(len(chunk))
                     
-                    game_buffer = ""
-                    games_processed = 0
-                    bytes_read = 0
+                    game_buffer += chunk
+                    consumed = 0
                     
                     try:
-                        while True:
-                            # Read decompressed data in chunks
-                            chunk = reader.read(8192)
-                            if not chunk:
-                                break
-                            
-                            # Update progress bar (approximate based on chunk size)
-                            bytes_read += len(chunk)
-                            progress_bar.update(len(chunk))
-                            
-                            try:
-                                decoded_chunk = chunk.decode('utf-8')
-                                game_buffer += decoded_chunk
+                        # Process complete games (PGN is handled as raw bytes)
+                        with memoryview(game_buffer) as view:
+                            while True:
+                                separator = game_buffer.find(b'\n\n\n', search_start)
+                                if separator < 0:
+                                    break
                                 
-                                # Process complete games
-                                while '\n\n\n' in game_buffer:
-                                    game_text, game_buffer = game_buffer.split('\n\n\n', 1)
-                                    if game_text.strip():
-                                        self.process_game(game_text)
-                                        games_processed += 1
-                                        
-                                        # Update progress bar description with game count (less frequently)
-                                        if games_processed % 50000 == 0:  # Every 50k games instead of 10k
-                                            progress_bar.set_postfix(games=f"{games_processed:,}")
-                            
-                            except Exception as e:
-                                # Only log warnings occasionally to avoid spam
-                                if games_processed % 100000 == 0:  # Only every 100k games
-                                    logger.warning(f"Error processing chunk: {e}")
-                                continue
-                        
-                        # Process any remaining game
-                        if game_buffer.strip():
-                            self.process_game(game_buffer)
-                            games_processed += 1
-                        
-                        # Final update
-                        progress_bar.set_postfix(games=f"{games_processed:,}")
-                        progress_bar.close()
-                        
-                        logger.info(f"Completed processing {month}: {games_processed:,} games")
-                        return True
-                        
+                                game_text = bytes(view[consumed:separator])
+                                consumed = search_start = separator + 3
+                                
+                                if game_text.strip():
+                                    self.process_game(game_text)
+                                    games_processed += 1
+                                    
+                                    # Update progress bar description with game count (less frequently)
+                                    if games_processed % 50000 == 0:  # Every 50k games instead of 10k
+                                        progress_bar.set_postfix(games=f"{games_processed:,}")
+                    
                     except Exception as e:
-                        progress_bar.close()
-                        raise e
+                        # Only log warnings occasionally to avoid spam
+                        if games_processed % 100000 == 0:  # Only every 100k games
+                            logger.warning(f"Error processing chunk: {e}")
+                        continue
+                    
+                    finally:
+                        # Drop consumed games once per chunk; a separator may straddle the next chunk
+                        del game_buffer[:consumed]
+                        search_start = max(0, len(game_buffer) - 2)
                 
-        except Exception as e:
-            logger.error(f"Error processing local file {filename}: {e}")
-            return False
+                # Process any remaining game
+                if game_buffer.strip():
+                    self.process_game(bytes(game_buffer))
+                    games_processed += 1
+                
+                # Final update
+                progress_bar.set_postfix(games=f"{games_processed:,}")
+                progress_bar.close()
+                
+                logger.info(f"Completed processing {month}: {games_processed:,} games")
+                return True
+                
+            except Exception as e:
+                progress_bar.close()
+                raise e
     
-    def process_game(self, game_text: str) -> None:
+    def process_game(self, game_text: bytes) -> None:
         """Process a single PGN game (first 35 moves only) - thread-safe"""
         try:
-            # Parse PGN
-            game = chess.pgn.read_game(io.StringIO(game_text))
-            if not game:
+            # Skip games without ratings before doing any other parsing
+            white_match = _WHITE_ELO_RE.search(game_text)
+            if white_match is None:
+                return
+            black_match = _BLACK_ELO_RE.search(game_text)
+            if black_match is None:
                 return
             
             # Extract game metadata
-            headers = game.headers
-            white_elo = self._safe_int(headers.get('WhiteElo', '0'))
-            black_elo = self._safe_int(headers.get('BlackElo', '0'))
-            result = headers.get('Result', '*')
-            
-            # Skip games without ratings
+            white_elo = int(white_match.group(1))
+            black_elo = int(black_match.group(1))
             if white_elo == 0 or black_elo == 0:
                 return
             
-            # Calculate average rating
-            avg_rating = (white_elo + black_elo) / 2
+            result_match = _RESULT_RE.search(game_text)
+            result = result_match.group(1) if result_match else b'*'
+            
+            # Move text follows the blank line after the header block
+            movetext = game_text.lstrip().partition(b'\n\n')[2]
+            
+            # Combined rating of both players (averaged once, when results are saved)
+            rating = white_elo + black_elo
+            
+            # Tokenize only the mainline SAN moves we will actually replay
+            san_moves = _SAN_RE.findall(_COMMENT_RE.sub(b'', movetext))[:MAX_PLIES]
             
             # Collect position updates to batch them
             position_updates = []
             
-            # Iterate through game positions (limit to first 35 moves = 70 plies)
-            board = game.board()
-            move_count = 0
-            max_moves = 35  # Limit to first 35 moves for performance
-            
-            for move in game.mainline_moves():
-                # Check if we've reached the move limit
-                if move_count >= max_moves * 2:  # 2 plies per move
-                    break
-                
-                current_fen = board.fen()
-                
+            board = self._tls_board()
+            board.reset()
+            for san in san_moves:
                 # Check if this position is in our target set
-                if current_fen in self.target_fens:
-                    position_updates.append((current_fen, avg_rating, result))
+                if self._maybe_in_targets(board):
+                    current_key = _board_key(board)  # No FEN string is rendered
+                    if current_key in self.target_fens:
+                        position_updates.append(current_key)
                 
-                # Make the move
-                board.push(move)
-                move_count += 1
+                # Make the move; stop at the first move we cannot replay
+                try:
+                    board.push(board.parse_san(san.decode('ascii')))
+                except ValueError:
+                    break
             
-            # Apply all updates in a single thread-safe operation
+            # Accumulate into this thread's partial stats (no locking needed)
             if position_updates:
-                with self.stats_lock:
-                    for fen, rating, game_result in position_updates:
-                        if fen in self.stats:  # Extra safety check
-                            stats = self.stats[fen]
-                            
-                            # Update statistics
-                            stats.games_analyzed += 1
-                            stats.frequency_count += 1
-                            
-                            # Update rating average
-                            if stats.avg_rating is None:
-                                stats.avg_rating = rating
-                            else:
-                                # Running average
-                                stats.avg_rating = ((stats.avg_rating * (stats.games_analyzed - 1)) + rating) / stats.games_analyzed
-                            
-                            # Update win/loss/draw counts
-                            if game_result == '1-0':  # White wins
-                                stats.white_wins += 1
-                            elif game_result == '0-1':  # Black wins
-                                stats.black_wins += 1
-                            elif game_result == '1/2-1/2':  # Draw
-                                stats.draws += 1
+                result_slot = RESULT_SLOTS.get(result)  # Resolved once per game
+                tls_stats = self._tls_stats()
+                for key in position_updates:
+                    counts = tls_stats.get(key)
+                    if counts is None:
+                        counts = tls_stats[key] = [0, 0, 0, 0, 0]
+                    
+                    # Update statistics
+                    counts[GAMES] += 1
+                    counts[RATING_SUM] += rating
+                    if result_slot is not None:
+                        counts[result_slot] += 1
                 
         except Exception as e:
             # Skip malformed games
             pass
     
-    def _safe_int(self, value: str) -> int:
-        """Safely convert string to int"""
-        try:
-            return int(value)
-        except (ValueError, TypeError):
-            return 0
+    def _maybe_in_targets(self, board: chess.Board) -> bool:
+        """Fast pre-check that rules out most non-target positions without building a FEN"""
+        return board.occupied in self.target_occupancy
+    
+    def _tls_board(self) -> chess.Board:
+        """Get the calling thread's reusable board (reset per game instead of rebuilt)"""
+        board = getattr(self._tls, 'board', None)
+        if board is None:
+            board = self._tls.board = chess.Board()
+        return board
+    
+    def _tls_stats(self) -> PartialStats:
+        """Get the calling thread's partial stats, keyed by position key"""
+        tls_stats = getattr(self._tls, 'stats', None)
+        if tls_stats is None:
+            tls_stats = self._tls.stats = {}
+        return tls_stats
+    
+    def _take_tls_stats(self) -> PartialStats:
+        """Detach and return the calling thread's partial stats"""
+        tls_stats = self._tls_stats()
+        self._tls.stats = {}
+        return tls_stats
+    
+    def _mark_month_processed(self, month: str) -> None:
+        """Record a finished month by swapping in a new set, so readers never need the lock"""
+        with self.months_lock:
+            self.processed_months = self.processed_months | {month}
+    
+    def _merge_partial_stats(self, partial_stats: PartialStats) -> None:
+        """Merge one thread's or worker process's partial stats into the shared stats under a single lock"""
+        with self.stats_lock:
+            for key, (games, rating_sum, white_wins, black_wins, draws) in partial_stats.items():
+                for fen in self.fens_by_key.get(key, ()):
+                    stats = self.stats.get(fen)
+                    if stats is None:
+                        continue
+                    
+                    stats.games_analyzed += games
+                    stats.frequency_count += games
+                    stats.rating_sum += rating_sum
+                    stats.white_wins += white_wins
+                    stats.black_wins += black_wins
+                    stats.draws += draws
     
     def calculate_popularity_scores(self) -> None:
         """Calculate popularity scores using percentile-based algorithm"""
         logger.info("Calculating popularity scores...")
         
+        all_stats = list(self.stats.values())
+        counts = np.fromiter((stats.games_analyzed for stats in all_stats), dtype=np.int64, count=len(all_stats))
+        
         # Get all game counts, excluding positions with 0 games
-        game_counts = [stats.games_analyzed for stats in self.stats.values() if stats.games_analyzed > 0]
+        game_counts = np.sort(counts[counts > 0])
         
-        if not game_counts:
+        if not game_counts.size:
             logger.warning("No games found in any position")
             return
         
-        # Sort game counts
-        game_counts.sort()
+        # Calculate percentile thresholds (10%, 20%, ..., 100% of the sorted counts)
+        n = game_counts.size
+        indices = np.maximum(((np.arange(1, 11) / 10) * n).astype(np.int64) - 1, 0)
+        percentile_thresholds = game_counts[indices]
         
-        # Calculate percentile thresholds
-        n = len(game_counts)
-        percentile_thresholds = []
-        for i in range(1, 11):  # 10%, 20%, ..., 100%
-            index = int((i / 10) * n) - 1
-            if index < 0:
-                index = 0
-            percentile_thresholds.append(game_counts[index])
+        # Score = 1 + number of thresholds the position's count exceeds (capped at 10)
+        scores = np.minimum(np.searchsorted(percentile_thresholds, counts, side='left') + 1, 10)
         
-        # Assign popularity scores
-        for fen, stats in self.stats.items():
-            if stats.games_analyzed == 0:
-                stats.popularity_score = 0
-                stats.confidence_score = 0.0
-            else:
-                # Find which percentile this position falls into
-                score = 1
-                for threshold in percentile_thresholds:
-                    if stats.games_analyzed <= threshold:
-                        break
-                    score += 1
-                
-                stats.popularity_score = min(score, 10)
-                
-                # Calculate confidence score based on sample size
-                # Using a simple logarithmic confidence measure
-                if stats.games_analyzed >= 1000:
-                    stats.confidence_score = 1.0
-                elif stats.games_analyzed >= 100:
-                    stats.confidence_score = 0.8
-                elif stats.games_analyzed >= 10:
-                    stats.confidence_score = 0.6
-                else:
-                    stats.confidence_score = 0.4
+        # Calculate confidence score based on sample size (<10, 10+, 100+, 1000+ games)
+        confidence = CONFIDENCE_LEVELS[np.searchsorted(CONFIDENCE_GAME_COUNTS, counts, side='right')]
+        
+        # Positions without games get neither score
+        unplayed = counts == 0
+        scores[unplayed] = 0
+        confidence[unplayed] = 0.0
+        
+        # Assign popularity scores (tolist() gives plain ints/floats for JSON)
+        for stats, score, confidence_score in zip(all_stats, scores.tolist(), confidence.tolist()):
+            stats.popularity_score = score
+            stats.confidence_score = confidence_score
         
         logger.info(f"Popularity scores calculated for {len(self.stats)} positions")
     
@@ -563,9 +937,10 @@ class LichessAnalyzer:
         final_data = {}
         for fen, stats in self.stats.items():
             stats.analysis_date = analysis_date
+            stats.avg_rating = stats.rating_sum / (2 * stats.games_analyzed) if stats.games_analyzed else None
             
             # Convert counts to rates
-            final_stats_dict = asdict(stats)
+            final_stats_dict = stats.to_dict()
             if stats.games_analyzed > 0:
                 final_stats_dict['white_win_rate'] = stats.white_wins / stats.games_analyzed
                 final_stats_dict['black_win_rate'] = stats.black_wins / stats.games_analyzed
@@ -600,20 +975,20 @@ class LichessAnalyzer:
             # Initialize thread-safe progress monitoring
             self.initialize_progress_monitoring()
             
-            # Clean up any existing temp files
-            self.cleanup_temp_files()
-            
             # Load target FEN positions
             self.load_target_fens(eco_files)
             
             # Load checkpoint if it exists
             self.load_checkpoint()
             
+            # Clean up leftover temp files (cached months still to process are kept for reuse)
+            self.cleanup_temp_files()
+            
             # Generate month list
             months = self.generate_month_list()
             
-            # Filter out already processed months
-            remaining_months = [month for month in months if month not in self.processed_months]
+            # Filter out already processed months (fixed before the workers start)
+            remaining_months = tuple(sorted(set(months) - self.processed_months))
             
             if not remaining_months:
                 logger.info("All months already processed!")
@@ -630,10 +1005,22 @@ class LichessAnalyzer:
                     temp_file_path = self.work_dir / temp_filename
                     if temp_file_path.exists():
                         existing_files.append(month)
-                        if self.validate_downloaded_file(str(temp_file_path)):
-                            valid_existing_files.append(month)
-                        else:
-                            invalid_existing_files.append(month)
+                
+                if existing_files:
+                    # Validate in parallel: each check is a small blocking read, so threads overlap them
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(existing_files)),
+                                                               thread_name_prefix="Validate") as executor:
+                        results = executor.map(self.validate_downloaded_file,
+                                               [str(self.work_dir / f"temp_{month}.pgn.zst") for month in existing_files])
+                        
+                        # Remembered so the download worker doesn't read the file again
+                        self.validated_files.update(zip(existing_files, results))
+                
+                for month in existing_files:
+                    if self.validated_files[month]:
+                        valid_existing_files.append(month)
+                    else:
+                        invalid_existing_files.append(month)
                 
                 if existing_files:
                     logger.info(f"Found {len(existing_files)} existing temp files")
@@ -659,6 +1046,7 @@ class LichessAnalyzer:
                 # Start process worker thread
                 process_thread = threading.Thread(
                     target=self.process_worker,
+                    args=(eco_files,),
                     name="ProcessWorker"
                 )
                 process_thread.daemon = True
@@ -673,7 +1061,7 @@ class LichessAnalyzer:
                     self.shutdown_requested.set()
                     # Give threads time to see the shutdown signal
                     download_thread.join(timeout=5)
-                    process_thread.join(timeout=5)
+                    process_thread.join(timeout=WORKER_STOP_GRACE + 5)  # Lets it stop the parser processes
                 except Exception as e:
                     logger.error(f"Error during parallel processing: {e}")
                     self.shutdown_requested.set()
@@ -691,10 +1079,13 @@ class LichessAnalyzer:
             logger.error(f"Critical error in analysis: {e}")
             self.shutdown_requested.set()
         finally:
+            # Don't lose months finished since the last batched checkpoint
+            self.flush_checkpoint()
+            
             # Final cleanup
             self.cleanup_temp_files()
     
-    def download_worker(self, months: List[str]) -> None:
+    def download_worker(self, months: Tuple[str, ...]) -> None:
         """Download worker thread - downloads files and adds them to processing queue"""
         try:
             logger.info(f"Download worker: Starting to process {len(months)} months")
@@ -705,27 +1096,34 @@ class LichessAnalyzer:
                     logger.info("Download worker: Shutdown requested")
                     break
                 
-                # Skip already processed months (checkpoint protection)
-                if month in self.processed_months:
-                    logger.info(f"Download worker: Month {month} already processed, skipping")
-                    continue
-                
                 url = self.lichess_base_url.format(month)
                 temp_filename = f"temp_{month}.pgn.zst"
                 temp_file_path = self.work_dir / temp_filename
                 
+                # A month decompressed by an earlier run can be parsed straight away
+                pgn_file_path = temp_file_path.with_suffix('')
+                if self.decompress_once and pgn_file_path.exists():
+                    logger.info(f"Download worker: Using decompressed {pgn_file_path}")
+                    if not self._queue_month(month, str(pgn_file_path)):
+                        break
+                    continue
+                
                 # Check if file already exists (file system check)
                 if temp_file_path.exists():
                     logger.info(f"Download worker: Found existing file {temp_file_path}")
                     
-                    # Validate the existing file thoroughly
-                    if self.validate_downloaded_file(str(temp_file_path)):
+                    # Validate the existing file thoroughly (unless already done at startup)
+                    is_valid = self.validated_files.pop(month, None)
+                    if is_valid is None:
+                        is_valid = self.validate_downloaded_file(str(temp_file_path))
+                    if is_valid:
                         file_size = temp_file_path.stat().st_size
                         logger.info(f"Download worker: Using validated existing file {temp_file_path} ({file_size / (1024*1024*1024):.2f} GB)")
                         
                         # Add to processing queue directly (no download needed)
                         logger.info(f"Download worker: Adding existing {month} to processing queue")
-                        self.download_queue.put((month, str(temp_file_path)))
+                        if not self._queue_month(month, str(temp_file_path)):
+                            break
                         continue  # Skip download and move to next month (no pause needed)
                     else:
                         logger.warning(f"Download worker: Existing file {temp_file_path} failed validation, will re-download")
@@ -736,6 +1134,19 @@ class LichessAnalyzer:
                             logger.warning(f"Download worker: Failed to remove invalid file {temp_file_path}")
                 
                 # File doesn't exist or is invalid, need to download
+                if not self.remote_file_available(url):
+                    # Typically the current month, which Lichess hasn't published yet
+                    logger.info(f"Download worker: {month} is not available on the server (404), skipping")
+                    continue
+                
+                if not self.cache_raw:
+                    # The parser process streams the URL itself; nothing is written to disk
+                    logger.info(f"Download worker: Queueing {month} for streaming from {url}")
+                    if not self._queue_month(month, url):
+                        break
+                    time.sleep(1)  # Space out stream starts too
+                    continue
+                
                 logger.info(f"Download worker: Starting download for {month} from {url}")
                 
                 # Download the file with retry logic
@@ -744,7 +1155,8 @@ class LichessAnalyzer:
                     if self.validate_downloaded_file(str(temp_file_path)):
                         # Add to processing queue (will block if queue is full)
                         logger.info(f"Download worker: Adding downloaded {month} to processing queue")
-                        self.download_queue.put((month, str(temp_file_path)))
+                        if not self._queue_month(month, str(temp_file_path)):
+                            break
                     else:
                         logger.error(f"Download worker: Downloaded file {temp_file_path} failed validation")
                         # Remove the invalid downloaded file
@@ -767,68 +1179,220 @@ class LichessAnalyzer:
             self.download_complete.set()
             logger.info("Download worker: Finished")
 
-    def process_worker(self) -> None:
-        """Process worker thread - processes files from the download queue"""
+    def _queue_month(self, month: str, source: str) -> bool:
+        """Hand a month to the process worker, returns False if shutdown came first"""
+        # The process worker stops draining the queue on shutdown, so never block on a full one
+        while not self.shutdown_requested.is_set():
+            try:
+                self.download_queue.put((month, source), timeout=1)
+                return True
+            except queue.Full:
+                continue
+        logger.info(f"Download worker: Shutdown requested, not queueing {month}")
+        return False
+
+    def process_worker(self, eco_files: List[str]) -> None:
+        """Process worker thread - hands queued months to a pool of parser processes"""
+        pending: Dict[concurrent.futures.Future, Tuple[str, str]] = {}
+        held: Optional[Tuple[str, str]] = None  # Dequeued month waiting for a stream slot
+        executor: concurrent.futures.Executor
+        if _workers_importable():
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=_MP_CONTEXT,
+                initializer=_worker_init,
+                initargs=(eco_files, str(self.work_dir), self.shutdown_requested)
+            )
+            logger.info(f"Process worker: Started {self.max_workers} parser processes")
+        else:
+            # Spawned processes couldn't import the worker functions, so parse in this process
+            _worker_init(eco_files, str(self.work_dir), self.shutdown_requested)
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                             thread_name_prefix="Parser")
+            logger.warning("Process worker: Not running from a file (notebook cell?), "
+                           f"parsing in {self.max_workers} threads of this process instead")
+        
         try:
-            while True:
-                try:
-                    # Get file from queue (with timeout to check for completion)
-                    month, temp_file = self.download_queue.get(timeout=30)
-                    
-                    logger.info(f"Process worker: Processing {month}")
-                    
-                    # Process the file
-                    success = self.process_local_file(temp_file, month)
-                    
-                    if success:
-                        # Thread-safe update of processed months
-                        with self.stats_lock:
-                            self.processed_months.add(month)
-                        
-                        # Save checkpoint after successful processing
-                        self.save_checkpoint()
-                        logger.info(f"Process worker: Successfully processed {month}")
-                    else:
-                        logger.error(f"Process worker: Failed to process {month}")
-                    
-                    # Clean up temp file immediately
-                    if safe_file_remove(temp_file):
-                        # Only log cleanup success occasionally to reduce noise
-                        if success:
-                            logger.info(f"Process worker: Completed {month} and cleaned up temp file")
-                    else:
-                        logger.warning(f"Process worker: Failed to delete {temp_file}")
+            while not self.shutdown_requested.is_set():
+                # Merge results from any months that have finished
+                for future in [f for f in pending if f.done()]:
+                    month, source = pending.pop(future)
+                    try:
+                        _, success, month_stats = future.result()
+                    except Exception as e:
+                        logger.error(f"Process worker: Parser process failed on {month}: {e}")
+                        success, month_stats = False, {}
+                    self._finish_month(month, source, success, month_stats)
+                
+                # Don't pull more work than there are processes to run it
+                if len(pending) >= self.max_workers:
+                    concurrent.futures.wait(pending, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED)
+                    continue
+                
+                if held is None:
+                    try:
+                        # Get file from queue (with timeout to check for completion)
+                        held = self.download_queue.get(timeout=1)
+                    except queue.Empty:
+                        # Check if downloads are complete
+                        if self.download_complete.is_set() and self.download_queue.empty():
+                            if not pending:
+                                logger.info("Process worker: No more files to process")
+                                break
+                            concurrent.futures.wait(pending, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED)
+                        # Otherwise continue waiting
+                        continue
                     
                     # Mark task as done
                     self.download_queue.task_done()
-                    
-                except queue.Empty:
-                    # Check if downloads are complete
-                    if self.download_complete.is_set():
-                        logger.info("Process worker: No more files to process")
-                        break
-                    # Otherwise continue waiting
+                
+                month, source = held
+                if _is_remote(source):
+                    streams = sum(1 for _, queued in pending.values() if _is_remote(queued))
+                    if streams >= self.max_streams:
+                        # Be gentle with database.lichess.org: wait for a stream to finish
+                        concurrent.futures.wait(pending, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED)
+                        continue
+                held = None
+                
+                # A month that just failed may have stopped the run while we waited for a slot
+                if self.shutdown_requested.is_set():
+                    break
+                
+                logger.info(f"Process worker: Processing {month}")
+                if self.decompress_once and not _is_remote(source):
+                    # One month at a time, spread over every process
+                    concurrent.futures.wait(pending)
+                    success, month_stats = self._process_month_in_ranges(executor, month, source)
+                    self._finish_month(month, source, success, month_stats)
+                else:
+                    pending[executor.submit(_process_month_in_worker, month, source)] = (month, source)
                     
         except Exception as e:
             logger.error(f"Process worker error: {e}")
             self.shutdown_requested.set()
         finally:
+            if self.shutdown_requested.is_set():
+                # Months still running are abandoned, not merged. The parser processes see the
+                # shared shutdown event; any still blocked (e.g. on a stalled socket) are killed
+                for future in pending:
+                    future.cancel()
+                concurrent.futures.wait(pending, timeout=WORKER_STOP_GRACE)
+                _terminate_workers(executor)  # Before shutdown(), which drops the process table
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.flush_checkpoint()
             logger.info("Process worker: Finished")
+    
+    def _process_month_in_ranges(self, executor: concurrent.futures.Executor,
+                                 month: str, source: str) -> Tuple[bool, PartialStats]:
+        """Decompress a cached month once and parse its PGN ranges across the process pool"""
+        try:
+            pgn_file = source if source.endswith('.pgn') else self.decompress_to_pgn(source)
+            ranges = self.split_pgn_ranges(pgn_file, self.max_workers)
+            futures = [executor.submit(_process_range_in_worker, pgn_file, start, end)
+                       for start, end in ranges]
+            
+            # Merge per range so only a fully processed month reaches the shared stats
+            month_stats: PartialStats = {}
+            games = 0
+            for future in futures:
+                range_games, range_stats = future.result()
+                games += range_games
+                for key, partial in range_stats.items():
+                    totals = month_stats.get(key)
+                    if totals is None:
+                        month_stats[key] = partial
+                    else:
+                        for slot, value in enumerate(partial):
+                            totals[slot] += value
+            
+            logger.info(f"Processed {games:,} games from {pgn_file} in {len(ranges)} ranges")
+            return True, month_stats
+        except Exception as e:
+            logger.error(f"Process worker: Failed to process {month} in ranges: {e}")
+            return False, {}
+    
+    def _finish_month(self, month: str, source: str, success: bool, month_stats: PartialStats) -> None:
+        """Merge a finished month's partial stats, checkpoint and clean up its temp files"""
+        # Only a fully processed month contributes to the shared stats
+        if success:
+            self._merge_partial_stats(month_stats)
+            
+            self._mark_month_processed(month)
+        else:
+            logger.error(f"Process worker: Failed to process {month}")
+            if _is_remote(source) and not self.shutdown_requested.is_set():
+                # Retries are exhausted; stop like a failed cached download rather than skip the month
+                logger.error(f"Process worker: Giving up on streaming {month}, stopping")
+                self.shutdown_requested.set()
+        
+        # Streamed downloads never touch disk
+        if not _is_remote(source):
+            self._clean_up_month_files(month, source, success)
+        
+        if success:
+            # Checkpoint in batches; each write re-serializes every position
+            self.unsaved_months += 1
+            if self.unsaved_months >= CHECKPOINT_EVERY_MONTHS:
+                self.flush_checkpoint()
+            logger.info(f"Process worker: Successfully processed {month}")
+    
+    def _clean_up_month_files(self, month: str, source: str, success: bool) -> None:
+        """Delete a finished month's cached files once nothing needs them"""
+        if not success:
+            if self.shutdown_requested.is_set() or source.endswith('.pgn'):
+                # Interrupted rather than broken (or already decompressed): the next run reuses it
+                logger.info(f"Process worker: Keeping {source} for the next run")
+            elif not safe_file_remove(source):
+                logger.warning(f"Process worker: Failed to delete {source}")
+            return
+        
+        raw_file = source
+        if self.decompress_once:
+            # Hundreds of GB per month, and nothing reads it again once its stats are merged
+            pgn_file = source if source.endswith('.pgn') else str(Path(source).with_suffix(''))
+            if safe_file_remove(pgn_file, defer=True):
+                logger.info(f"Process worker: Completed {month} and removed decompressed {pgn_file}")
+            else:
+                logger.warning(f"Process worker: Failed to delete {pgn_file}")
+            raw_file = pgn_file + '.zst'
+        
+        # A crashed run resumes from the raw download, so it goes with the checkpoint
+        self.files_after_checkpoint.append(raw_file)
 
     def cleanup_temp_files(self) -> None:
-        """Clean up any remaining temp files"""
+        """Clean up partial temp files and those of already processed months"""
         try:
             # Use pathlib for better cross-platform compatibility
-            for temp_file in self.work_dir.glob('temp_*.pgn.zst*'):  # Include .tmp files
-                if safe_file_remove(str(temp_file)):
-                    logger.info(f"Cleaned up temp file: {temp_file.name}")
-                else:
-                    logger.warning(f"Failed to clean up {temp_file.name}")
-        except Exception as e:
+            # Raw downloads and decompressed PGNs, including their partial .tmp files
+            temp_files = [*self.work_dir.glob('temp_*.pgn.zst*'), *self.work_dir.glob('temp_*.pgn'),
+                          *self.work_dir.glob('temp_*.pgn.tmp')]
+            unsaved_files = set(self.files_after_checkpoint)  # Processed, but the checkpoint write failed
+            for temp_file in temp_files:
+                # Complete files of months still to process let the next run resume without
+                # downloading them again (cached .pgn.zst files are validated before reuse)
+                month = temp_file.name[len('temp_'):].split('.', 1)[0]
+                if temp_file.suffix != '.tmp' and (month not in self.processed_months or
+                                                   str(temp_file) in unsaved_files):
+                    continue
+                
+                # The glob just saw the file, so unlink directly instead of re-checking it exists
+                try:
+                    temp_file.unlink()
+                except FileNotFoundError:
+                    continue  # Already removed by a worker
+                except PermissionError:
+                    # Still locked (Windows): fall back to the retrying remove (deferred only for
+                    # processed months, whose paths are never written again)
+                    if not safe_file_remove(str(temp_file), defer=month in self.processed_months):
+                        logger.warning(f"Failed to clean up {temp_file.name}")
+                        continue
+                logger.info(f"Cleaned up temp file: {temp_file.name}")
+        except OSError as e:
             logger.warning(f"Error during cleanup: {e}")
     
-    def create_progress_bar(self, desc: str, total: int, unit: str = 'B') -> tqdm:
-        """Create a standardized progress bar"""
+    def create_progress_bar(self, desc: str, total: Optional[int], unit: str = 'B') -> tqdm:
+        """Create a standardized progress bar (disabled when output isn't a terminal or notebook)"""
         return tqdm(
             desc=desc,
             total=total,
@@ -836,135 +1400,245 @@ class LichessAnalyzer:
             unit_scale=True,
             unit_divisor=1024,
             ncols=80,
-            mininterval=0.5,
-            maxinterval=2.0,
-            leave=True,
-            file=sys.stdout,
-            disable=False  # Ensure progress bars are always shown
+            mininterval=1.0,   # Update at most every 1 second
+            maxinterval=3.0,
+            miniters=max(1, total // 200) if total else 1,  # ...and at most every 0.5% of the total
+            leave=True,        # Keep progress bar after completion
+            file=sys.stdout,   # Explicitly use stdout
+            position=0,        # Position for multi-threaded env
+            dynamic_ncols=True,
+            disable=not (sys.stdout.isatty() or 'ipykernel' in sys.modules)  # No redraw spam in CI logs
         )
     
     def validate_downloaded_file(self, filename: str) -> bool:
         """Validate that a downloaded file is complete and not corrupted"""
         try:
-            filepath = Path(filename)
-            
-            if not filepath.exists():
-                logger.warning(f"File {filename} does not exist")
-                return False
-            
-            # Check if file size is reasonable (at least 100MB for Lichess files)
-            file_size = filepath.stat().st_size
-            if file_size < 100 * 1024 * 1024:  # 100MB minimum
-                logger.warning(f"File {filename} seems too small ({file_size / (1024*1024):.1f} MB), may be incomplete")
-                return False
-            
-            # Check if file is very large (sanity check - Lichess files can be up to 50GB for busy months)
-            if file_size > 50 * 1024 * 1024 * 1024:  # 50GB maximum (very generous)
-                logger.warning(f"File {filename} seems unusually large ({file_size / (1024*1024*1024):.1f} GB)")
-                return False
-            
-            # Try to open and read the first few bytes to verify it's a valid zst file
-            try:
-                with open(filename, 'rb') as f:
-                    # Read first 4 bytes - zstd magic number is 0xFD2FB528
-                    magic = f.read(4)
-                    if len(magic) < 4:
-                        logger.warning(f"File {filename} appears to be truncated (less than 4 bytes)")
-                        return False
-                    
-                    # Check for zstd magic number (little-endian: 0x28, 0xb5, 0x2f, 0xfd)
-                    if magic != b'\x28\xb5\x2f\xfd':
-                        logger.warning(f"File {filename} doesn't have valid zstd magic number")
-                        logger.warning(f"Expected: 28b52ffd, Got: {magic.hex()}")
-                        
-                        # Additional debug info
-                        if magic.startswith(b'<!DOCTYPE') or magic.startswith(b'<html'):
-                            logger.warning(f"File {filename} appears to be HTML (possibly an error page)")
-                        elif magic.startswith(b'PK'):
-                            logger.warning(f"File {filename} appears to be a ZIP file")
-                        elif len(magic) == 0:
-                            logger.warning(f"File {filename} is empty")
-                        
-                        return False
-                    
-                    # Try to read more to ensure file isn't truncated
-                    f.seek(0)
-                    header = f.read(min(1024, file_size))  # Read up to 1KB or file size
-                    if len(header) < min(1024, file_size):
-                        logger.warning(f"File {filename} appears to be truncated (header too short)")
-                        return False
-                        
-            except Exception as e:
-                logger.warning(f"Error reading {filename}: {e}")
-                return False
-            
-            # Try to create a decompressor to verify file structure
-            try:
-                with open(filename, 'rb') as f:
-                    decompressor = zstd.ZstdDecompressor()
-                    # Try to read just the first few bytes of decompressed data
-                    with decompressor.stream_reader(f) as reader:
-                        test_data = reader.read(100)  # Read first 100 bytes
-                        if not test_data:
-                            logger.warning(f"File {filename} appears to be empty after decompression")
-                            return False
-                            
-            except Exception as e:
-                logger.warning(f"Error validating zstd structure of {filename}: {e}")
-                return False
+            file_size = os.stat(filename).st_size
+        except FileNotFoundError:
+            logger.warning(f"File {filename} does not exist")
+            return False
+        except OSError as e:
+            logger.warning(f"Error validating {filename}: {e}")
+            return False
+        
+        # Check if file size is reasonable (at least 100MB for Lichess files)
+        if file_size < 100 * 1024 * 1024:  # 100MB minimum
+            logger.warning(f"File {filename} seems too small ({file_size / (1024*1024):.1f} MB), may be incomplete")
+            return False
+        
+        # Check if file is very large (sanity check - Lichess files can be up to 50GB for busy months)
+        if file_size > 50 * 1024 * 1024 * 1024:  # 50GB maximum (very generous)
+            logger.warning(f"File {filename} seems unusually large ({file_size / (1024*1024*1024):.1f} GB)")
+            return False
+        
+        # Read the head of the file once; every check below works on this buffer
+        try:
+            header = read_file_head(filename, VALIDATION_PROBE_SIZE)
+        except OSError as e:
+            logger.warning(f"Error reading {filename}: {e}")
+            return False
+        
+        # Read first 4 bytes - zstd magic number is 0xFD2FB528
+        magic = header[:4]
+        if len(magic) < 4:
+            logger.warning(f"File {filename} appears to be truncated (less than 4 bytes)")
+            return False
+        
+        # Check for zstd magic number (little-endian: 0x28, 0xb5, 0x2f, 0xfd)
+        if magic != b'\x28\xb5\x2f\xfd':
+            logger.warning(f"File {filename} doesn't have valid zstd magic number")
+            logger.warning(f"Expected: 28b52ffd, Got: {magic.hex()}")
             
-            logger.info(f"File {filename} validated successfully ({file_size / (1024*1024*1024):.2f} GB)")
-            return True
+            # Additional debug info
+            if header.startswith(b'<!DOCTYPE') or header.startswith(b'<html'):
+                logger.warning(f"File {filename} appears to be HTML (possibly an error page)")
+            elif magic.startswith(b'PK'):
+                logger.warning(f"File {filename} appears to be a ZIP file")
             
-        except Exception as e:
-            logger.warning(f"Error validating {filename}: {e}")
             return False
+        
+        # Ensure the file isn't shorter than its size claims
+        if len(header) < min(VALIDATION_PROBE_SIZE, file_size):
+            logger.warning(f"File {filename} appears to be truncated (header too short)")
+            return False
+        
+        # Parse the zstd frame header to verify file structure (no decompression context needed)
+        try:
+            frame = zstd.get_frame_parameters(header)
+        except zstd.ZstdError as e:
+            logger.warning(f"Error validating zstd structure of {filename}: {e}")
+            return False
+        if frame.content_size == 0:
+            logger.warning(f"File {filename} appears to be empty after decompression")
+            return False
+        
+        logger.info(f"File {filename} validated successfully ({file_size / (1024*1024*1024):.2f} GB)")
+        return True
 
     def debug_list_temp_files(self) -> None:
         """Debug method to list all temp files in the directory"""
         try:
-            temp_files = []
-            for filename in os.listdir('.'):
-                if filename.startswith('temp_') and filename.endswith('.pgn.zst'):
-                    temp_files.append(filename)
+            # scandir entries carry their stat info, so sizes need no extra lookups
+            with os.scandir(self.work_dir) as entries:
+                temp_files = [(entry.name, entry.stat().st_size) for entry in entries
+                              if entry.name.startswith('temp_') and entry.name.endswith('.pgn.zst')]
             
             if temp_files:
                 logger.info(f"Debug: Found {len(temp_files)} temp files in directory:")
-                for temp_file in temp_files:
-                    file_size = os.path.getsize(temp_file)
+                for temp_file, file_size in temp_files:
                     logger.info(f"  - {temp_file} ({file_size / (1024*1024*1024):.2f} GB)")
             else:
                 logger.info("Debug: No temp files found in directory")
-        except Exception as e:
+        except OSError as e:
             logger.error(f"Debug: Error listing temp files: {e}")
 
+# Parser process state (one analyzer per worker process, set up by _worker_init)
+_worker_analyzer: Optional[LichessAnalyzer] = None
+
+def _worker_init(eco_files: List[str], work_dir: str, shutdown_requested) -> None:
+    """Initialize a parser process once: load the target positions it matches against"""
+    global _worker_analyzer
+    _worker_analyzer = LichessAnalyzer(work_dir=work_dir)
+    _worker_analyzer.shutdown_requested = shutdown_requested  # The parent's, so shutdown reaches us
+    _worker_analyzer.load_target_fens(eco_files)
+
+def _workers_importable() -> bool:
+    """Whether spawned parser processes can import the worker functions by reference"""
+    # Code pasted into a notebook cell lives in a __main__ without a file to re-import
+    return (_worker_init.__module__ != '__main__' or
+            getattr(sys.modules['__main__'], '__file__', None) is not None)
+
+def _terminate_workers(executor: concurrent.futures.Executor) -> None:
+    """Kill parser processes that are still running (their months are being abandoned)"""
+    terminate_workers = getattr(executor, 'terminate_workers', None)  # Python 3.14+
+    if terminate_workers is not None:
+        terminate_workers()
+        return
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+def _process_month_in_worker(month: str, source: str) -> Tuple[str, bool, PartialStats]:
+    """Parse one month (local file or URL) in a parser process and return its partial stats"""
+    analyzer = _worker_analyzer
+    if not _is_remote(source):
+        success = analyzer.process_local_file(source, month)
+        return month, success, analyzer._take_tls_stats()
+    
+    for attempt in range(1, STREAM_RETRIES + 1):
+        success = _stream_month(analyzer, month, source)
+        if success or analyzer.shutdown_requested.is_set():
+            break
+        
+        # A stream that broke mid-month restarts from scratch, so drop what it counted
+        analyzer._take_tls_stats()
+        if attempt < STREAM_RETRIES:
+            logger.warning(f"Streaming {month} failed (attempt {attempt}/{STREAM_RETRIES}), "
+                           f"retrying in {STREAM_RETRY_DELAY} seconds...")
+            if analyzer.shutdown_requested.wait(STREAM_RETRY_DELAY):
+                break
+    return month, success, analyzer._take_tls_stats()
+
+def _stream_month(analyzer: LichessAnalyzer, month: str, url: str) -> bool:
+    """Stream and parse one month, overlapping the network transfer with parsing"""
+    fetcher = StreamingFetcher(analyzer.session, url, analyzer.os_config['chunk_size'],
+                               analyzer.shutdown_requested)
+    pump_thread = threading.Thread(target=fetcher.pump, name="StreamPump", daemon=True)
+    pump_thread.start()
+    success = analyzer.process_fetched_stream(fetcher, month)
+    pump_thread.join()
+    return success
+
+def _process_range_in_worker(filename: str, start: int, end: int) -> Tuple[int, PartialStats]:
+    """Parse one byte range of a decompressed PGN in a parser process"""
+    analyzer = _worker_analyzer
+    try:
+        games = analyzer.process_pgn_range(filename, start, end)
+    finally:
+        # Never leave a failed range's counts behind for the next task
+        partial_stats = analyzer._take_tls_stats()
+    return games, partial_stats
+
+def _is_remote(source: str) -> bool:
+    """Whether a queued month source is a URL to stream rather than a local file"""
+    return source.startswith(('http://', 'https://'))
+
 # OS-agnostic utility functions
 def get_temp_dir() -> Path:
     """Get OS-appropriate temporary directory"""
     return Path(tempfile.gettempdir())
 
-def safe_file_remove(filepath: str, max_retries: int = 3) -> bool:
+def safe_file_remove(filepath: str, max_retries: int = 3, defer: bool = False) -> bool:
     """Safely remove a file with retry logic for Windows file locking issues"""
     for attempt in range(max_retries):
         try:
-            if os.path.exists(filepath):
+            with contextlib.suppress(FileNotFoundError):  # Already gone counts as removed
                 os.remove(filepath)
-                return True
-            return True  # File doesn't exist, consider it removed
+            return True
         except PermissionError:
-            if platform.system() == "Windows":
+            if _IS_WINDOWS:
+                # Let the OS delete it once the process holding it lets go. The file lingers
+                # (delete pending) until then, so only callers that never reuse the path defer
+                if defer and _delete_on_close(filepath):
+                    return True
                 # Windows-specific handling for file locking
                 time.sleep(0.5)  # Wait a bit and retry
                 continue
             else:
                 raise
-        except Exception as e:
+        except OSError as e:
             if attempt == max_retries - 1:
                 logger.warning(f"Failed to remove {filepath} after {max_retries} attempts: {e}")
                 return False
             time.sleep(0.1)
     return False
 
+def _delete_on_close(filepath: str) -> bool:
+    """Mark a locked file for deletion when its last handle closes (Windows only)"""
+    from ctypes import wintypes
+    
+    DELETE = 0x00010000
+    FILE_SHARE_ALL = 0x00000007  # Read | write | delete
+    OPEN_EXISTING = 3
+    FILE_FLAG_DELETE_ON_CLOSE = 0x04000000
+    
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                     wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    
+    # Only succeeds if whoever holds the file opened it with FILE_SHARE_DELETE
+    handle = kernel32.CreateFileW(os.path.abspath(filepath), DELETE, FILE_SHARE_ALL, None,
+                                  OPEN_EXISTING, FILE_FLAG_DELETE_ON_CLOSE, None)
+    if handle in (None, wintypes.HANDLE(-1).value):
+        return False
+    kernel32.CloseHandle(handle)
+    return True
+
+def read_file_head(filepath: str, size: int) -> bytes:
+    """Read up to size bytes from the start of a file in one positioned read"""
+    fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        if hasattr(os, 'pread'):
+            return os.pread(fd, size, 0)
+        return os.read(fd, size)  # Windows has no pread; a fresh descriptor starts at offset 0
+    finally:
+        os.close(fd)
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write a file atomically: write a temp file in the same directory, then os.replace() it"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        safe_file_remove(temp_path, defer=True)  # mkstemp() names are never reused
+        raise
+
 def safe_file_move(src: str, dst: str, max_retries: int = 3) -> bool:
     """Safely move a file with retry logic for Windows"""
     for attempt in range(max_retries):
@@ -972,7 +1646,7 @@ def safe_file_move(src: str, dst: str, max_retries: int = 3) -> bool:
             shutil.move(src, dst)
             return True
         except PermissionError:
-            if platform.system() == "Windows":
+            if _IS_WINDOWS:
                 time.sleep(0.5)
                 continue
             else:
@@ -984,19 +1658,34 @@ def safe_file_move(src: str, dst: str, max_retries: int = 3) -> bool:
             time.sleep(0.1)
     return False
 
+def download_eco_file(session: requests.Session, url: str, eco_path: Path) -> None:
+    """Download one ECO file (reports, never raises)"""
+    print(f"Downloading {eco_path.name}...")
+    try:
+        response = session.get(url, timeout=30)
+        if response.status_code == 200:
+            # Ensure directory exists
+            eco_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(eco_path, 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            print(f"Successfully downloaded {eco_path.name}")
+        else:
+            print(f"Failed to download {eco_path.name} (HTTP {response.status_code})")
+    except Exception as e:
+        print(f"Error downloading {eco_path.name}: {e}")
+
 def get_os_specific_config():
     """Get OS-specific configuration settings"""
     config = {
-        'chunk_size': 8192,
+        'chunk_size': 1 << 20,  # 1 MiB per network read
         'file_retry_delay': 0.1,
         'max_file_retries': 3
     }
     
-    if platform.system() == "Windows":
+    if _IS_WINDOWS:
         config.update({
             'file_retry_delay': 0.5,
-            'max_file_retries': 5,
-            'chunk_size': 4096  # Smaller chunks for Windows
+            'max_file_retries': 5
         })
     
     return config
@@ -1004,14 +1693,26 @@ def get_os_specific_config():
 def main():
     """Main function for execution"""
     
-    # Determine ECO file paths based on current directory structure
-    current_dir = Path.cwd()
+    parser = argparse.ArgumentParser(description="Analyze Lichess games for opening popularity")
+    parser.add_argument('--cache-raw', action='store_true',
+                        help="Download each month's .pgn.zst to disk before processing instead of streaming it")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of parser processes (default: CPU count)")
+    parser.add_argument('--streams', type=int, default=DEFAULT_MAX_STREAMS,
+                        help=f"Maximum months streamed from Lichess at once (default: {DEFAULT_MAX_STREAMS})")
+    parser.add_argument('--fast-checkpoint', action='store_true',
+                        help="Write checkpoints with pickle instead of JSON")
+    parser.add_argument('--decompress-once', action='store_true',
+                        help="Decompress each cached month to a .pgn once and split it across parser processes (implies --cache-raw)")
+    # parse_known_args so the script still runs inside notebooks (which pass their own argv)
+    args, _ = parser.parse_known_args()
     
-    # Check if we're in the tools directory or project root
-    if current_dir.name == 'tools':
-        eco_base_path = current_dir.parent / 'data' / 'eco'
-    else:
-        eco_base_path = current_dir / 'data' / 'eco'
+    # Locate ECO files relative to this script (tools/analysis/) so any working directory works
+    try:
+        project_root = Path(__file__).resolve().parent.parent.parent
+    except NameError:
+        project_root = Path.cwd()  # Pasted into a notebook cell, there is no __file__
+    eco_base_path = project_root / 'data' / 'eco'
     
     # ECO files to load
     eco_files = [
@@ -1022,30 +1723,25 @@ def main():
         str(eco_base_path / "ecoE.json")
     ]
     
-    # Download ECO files if they don't exist
+    # Download ECO files if they don't exist (concurrently, over one keep-alive session)
     eco_base_url = "https://raw.githubusercontent.com/hayatbiralem/eco.json/master/"
-    for eco_file in eco_files:
-        eco_path = Path(eco_file)
-        if not eco_path.exists():
-            print(f"Downloading {eco_path.name}...")
-            try:
-                response = requests.get(eco_base_url + eco_path.name)
-                if response.status_code == 200:
-                    # Ensure directory exists
-                    eco_path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(eco_path, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
-                    print(f"Successfully downloaded {eco_path.name}")
-                else:
-                    print(f"Failed to download {eco_path.name} (HTTP {response.status_code})")
-            except Exception as e:
-                print(f"Error downloading {eco_path.name}: {e}")
+    missing_eco_paths = [Path(eco_file) for eco_file in eco_files if not Path(eco_file).exists()]
+    if missing_eco_paths:
+        with requests.Session() as session, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=len(missing_eco_paths)) as executor:
+            for eco_path in missing_eco_paths:
+                executor.submit(download_eco_file, session, eco_base_url + eco_path.name, eco_path)
     
     # Create analyzer and run analysis
     analyzer = LichessAnalyzer(
         start_date="2021-07",
         checkpoint_file="stats_checkpoint.json",
-        output_file="popularity_stats.json"
+        output_file="popularity_stats.json",
+        cache_raw=args.cache_raw,
+        max_workers=args.workers,
+        max_streams=args.streams,
+        fast_checkpoint=args.fast_checkpoint,
+        decompress_once=args.decompress_once
     )
     
     # Run the analysis